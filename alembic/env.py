@@ -1,4 +1,5 @@
 import asyncio
+import logging
 from logging.config import fileConfig
 
 from alembic import context
@@ -7,7 +8,8 @@ from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 from src.db.base import Base
-from src.db.models import User, Project
+from src.db.migrations import install_dry_run
+from src.db.models import User, Project, AuditEvent, OutboxJob
 
 config = context.config
 
@@ -16,6 +18,12 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+x_args = context.get_x_argument(as_dictionary=True)
+# alembic -x dry_run=true upgrade head — см. src/db/migrations.py
+config.attributes["dry_run"] = x_args.get("dry_run", "false").lower() in ("1", "true", "yes")
+# DDL, не получивший блокировку за это время, падает, а не блокирует трафик в очереди
+LOCK_TIMEOUT = x_args.get("lock_timeout", "5s")
+
 
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
@@ -32,6 +40,8 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
+    connection.exec_driver_sql(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    connection.commit()
     context.configure(
         connection=connection,
         target_metadata=target_metadata,
@@ -39,6 +49,15 @@ def do_run_migrations(connection: Connection) -> None:
         compare_server_default=True,
         render_as_batch=False,
     )
+    if config.attributes["dry_run"]:
+        logging.getLogger("alembic.online").info("[dry-run] nothing will be executed")
+        install_dry_run(context.get_context())
+        trans = connection.begin()
+        try:
+            context.run_migrations()
+        finally:
+            trans.rollback()
+        return
     with context.begin_transaction():
         context.run_migrations()
 
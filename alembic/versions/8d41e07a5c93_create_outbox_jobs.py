@@ -0,0 +1,41 @@
+"""Create outbox jobs
+
+Revision ID: 8d41e07a5c93
+Revises: 3f6a9c2d1b7e
+Create Date: 2026-10-19 11:03:54.218917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41e07a5c93'
+down_revision: Union[str, Sequence[str], None] = '3f6a9c2d1b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=128), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default='pending', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_outbox_jobs'))
+    )
+    op.create_index('ix_outbox_jobs_pending', 'outbox_jobs', ['available_at'], unique=False,
+                    postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_jobs_pending', table_name='outbox_jobs', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_table('outbox_jobs')
@@ -0,0 +1,28 @@
+"""Add user project count
+
+Revision ID: b27e5f1c9a04
+Revises: 8d41e07a5c93
+Create Date: 2026-10-19 11:47:09.630145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b27e5f1c9a04'
+down_revision: Union[str, Sequence[str], None] = '8d41e07a5c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('project_count', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'project_count')
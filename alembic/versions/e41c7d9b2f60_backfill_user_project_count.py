@@ -0,0 +1,36 @@
+"""Backfill user project count
+
+Revision ID: e41c7d9b2f60
+Revises: b27e5f1c9a04
+Create Date: 2026-10-19 12:31:52.418307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.db.migrations import backfill_in_batches
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41c7d9b2f60'
+down_revision: Union[str, Sequence[str], None] = 'b27e5f1c9a04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # отдельная ревизия: backfill_in_batches коммитит батчи сам, и DDL
+    # из b27e5f1c9a04 к этому моменту уже закоммичен вместе с её номером
+    backfill_in_batches(
+        'users',
+        "project_count = (SELECT count(*) FROM projects WHERE projects.owner_id = users.id)",
+        lock_rows=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
@@ -11,6 +11,7 @@ class UserOutDto(BaseModel):
     id: int
     email: EmailStr
     created_at: datetime
+    project_count: int = 0
     model_config = ConfigDict(from_attributes=True)
 
 class TokenPairDto(BaseModel):
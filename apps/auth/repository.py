@@ -1,12 +1,14 @@
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import EmailStr
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.db.models import User, RefreshToken
+from src.db.singleflight import get_by_id
+from src.outbox import enqueue
 
 
 class AuthRepository:
@@ -18,13 +20,14 @@ class AuthRepository:
         return q.scalars().one_or_none()
 
     async def get_user_by_id(self, id_: int) -> Optional[User]:
-        q = await self.session.execute(select(User).where(User.id == id_))
-        return q.scalars().one_or_none()
+        return await get_by_id(self.session, User, id_)
 
     async def create_user(self, *, email: EmailStr, password: str) -> User:
         user = User(email=email, password=password)
         self.session.add(user)
         try:
+            await self.session.flush()
+            enqueue(self.session, "user.registered", user_id=user.id, email=user.email)
             await self.session.commit()
         except IntegrityError:
             await self.session.rollback()
@@ -59,3 +62,8 @@ class AuthRepository:
         await self.session.execute(delete(RefreshToken).where(RefreshToken.jti == jti))
         await self.session.commit()
 
+    async def password_hash_distribution(self) -> Dict[str, int]:
+        # префикс bcrypt-хэша "$2b$12$" = схема + cost
+        prefix = func.substring(User.password, 1, 7)
+        q = await self.session.execute(select(prefix, func.count()).group_by(prefix))
+        return {p: n for p, n in q.all()}
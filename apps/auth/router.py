@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Dict
 
 from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
@@ -7,7 +7,9 @@ from starlette import status
 
 from apps.auth.dto import UserOutDto, UserCreateDto, TokenPairDto, RefreshTokenDto
 from apps.auth.service import AuthService
+from src.db.models import User
 from src.db.session import get_session
+from src.permissions import require_admin
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -43,3 +45,9 @@ async def logout(body: RefreshTokenDto, session: Annotated[AsyncSession, Depends
         await AuthService.logout(session, token=body.refresh_token)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+
+
+@router.get("/password-hashes", response_model=Dict[str, int])
+async def password_hashes(session: Annotated[AsyncSession, Depends(get_session)],
+                          admin: Annotated[User, Depends(require_admin)]):
+    return await AuthService.password_hash_distribution(session)
@@ -1,12 +1,20 @@
+import asyncio
+import logging
+import random
 from datetime import datetime, timezone
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 from pydantic import EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from apps.auth.repository import AuthRepository
-from src.config import settings
+from src.audit import audit_log
+from src.config import get_settings
 from src.db.models import User
-from src.security import hash_password, verify_password, create_jwt, decode_jwt
+from src.db.session import get_sessionmaker
+from src.metrics import metrics
+from src.security import hash_password, verify_password, create_jwt, decode_jwt, password_needs_rehash, schedule_rehash
+
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -27,6 +35,9 @@ class AuthService:
             return None
         if not verify_password(password, user.password):
             return None
+        if password_needs_rehash(user.password):
+            schedule_rehash(user.id, password, user.password)
+        await audit_log.emit("login", user_id=user.id)
         return user
 
     @staticmethod
@@ -34,13 +45,13 @@ class AuthService:
         access = create_jwt(
             sub=str(user.id),
             token_type="access",
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+            minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES,
         )
 
         refresh = create_jwt(
             sub=str(user.id),
             token_type="refresh",
-            days=settings.REFRESH_TOKEN_EXPIRE_DAYS,
+            days=get_settings().REFRESH_TOKEN_EXPIRE_DAYS,
         )
         payload = decode_jwt(refresh)
         jti = payload["jti"]
@@ -71,6 +82,7 @@ class AuthService:
 
         await repo.delete_token(jti)
         new_access , new_refresh = await AuthService.issue_token(session, user=user)
+        await audit_log.emit("token_refresh", user_id=user.id, jti=jti)
         return new_access, new_refresh
 
     @staticmethod
@@ -79,4 +91,28 @@ class AuthService:
         payload = decode_jwt(token)
         jti = payload["jti"]
 
-        await repo.delete_token(jti)
\ No newline at end of file
+        await repo.delete_token(jti)
+        await audit_log.emit("logout", user_id=int(payload["sub"]), jti=jti)
+
+    @staticmethod
+    async def password_hash_distribution(session: AsyncSession) -> Dict[str, int]:
+        distribution = await AuthRepository(session).password_hash_distribution()
+        # старые префиксы (исчезнувшие после rehash) не должны висеть в /metrics
+        metrics.replace("auth.password_hashes", distribution)
+        return distribution
+
+
+async def refresh_password_hash_metrics(interval: float = 300.0) -> None:
+    """Периодически обновляет распределение параметров хэшей в /metrics.
+
+    Первый подсчёт — не сразу, а через interval со случайным сдвигом: старт
+    воркера не трогает БД, и воркеры не сканируют users одновременно.
+    """
+    await asyncio.sleep(interval * random.uniform(0.5, 1.0))
+    while True:
+        try:
+            async with get_sessionmaker()() as session:
+                await AuthService.password_hash_distribution(session)
+        except Exception:
+            logger.exception("Failed to refresh password hash metrics")
+        await asyncio.sleep(interval)
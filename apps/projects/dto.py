@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -18,4 +18,32 @@ class ProjectUpdateDTO(BaseModel):
 class ProjectOutDTO(ProjectDTO):
     id: int
     owner_id: int
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+class ProjectBatchCreateOp(ProjectDTO):
+    op: Literal["create"]
+
+class ProjectBatchUpdateOp(BaseModel):
+    op: Literal["update"]
+    id: int
+    name: Optional[str] = Field(None, min_length=3, max_length=250)
+    description: Optional[str] = Field(None, min_length=5, max_length=1000)
+
+class ProjectBatchDeleteOp(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+ProjectBatchOp = Annotated[
+    Union[ProjectBatchCreateOp, ProjectBatchUpdateOp, ProjectBatchDeleteOp],
+    Field(discriminator="op"),
+]
+
+class ProjectBatchDTO(BaseModel):
+    operations: List[ProjectBatchOp] = Field(..., min_length=1, max_length=500)
+
+class ProjectBatchResultDTO(BaseModel):
+    index: int
+    op: str
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
@@ -0,0 +1,26 @@
+"""Сверка денормализованного users.project_count.
+
+    python -m apps.projects.reconcile
+"""
+import asyncio
+import logging
+
+from apps.projects.repository import ProjectRepository
+from src.db.session import get_sessionmaker
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile() -> int:
+    async with get_sessionmaker()() as session:
+        fixed = await ProjectRepository(session).reconcile_project_counts()
+    metrics.incr("projects.count_drift_fixed", fixed)
+    if fixed:
+        logger.warning("Repaired project_count drift for %d users", fixed)
+    return fixed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"fixed: {asyncio.run(reconcile())}")
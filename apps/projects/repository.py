@@ -1,13 +1,199 @@
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, insert, update, delete, func, any_, bindparam, column, Integer, String, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Any, List, Sequence
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from apps.projects.dto import ProjectDTO
+from apps.projects.dto import ProjectDTO, ProjectBatchOp
+from src.changefeed import notify_project_change, notify_project_changes
+from src.config import get_settings
 from src.db.base import BaseRepository
-from src.db.models import Project
+from src.db.models import Project, User
+from src.exceptions import QuotaExceededError
+from src.outbox import enqueue
 
 
 class ProjectRepository(BaseRepository[Project]):
     def __init__(self, session: AsyncSession):
         super().__init__(session, Project)
+
+    async def create(self, **kwargs) -> Project:
+        owner_id = kwargs["owner_id"]
+        # инкремент счётчика и проверка квоты одним UPDATE, в той же транзакции что и INSERT
+        stmt = (
+            update(User)
+            .where(User.id == owner_id, User.project_count < get_settings().MAX_PROJECTS_PER_USER)
+            .values(project_count=User.project_count + 1)
+            .returning(User.id)
+        )
+        res = await self.session.execute(stmt)
+        if not res.first():
+            await self.session.rollback()
+            raise QuotaExceededError("Project quota exceeded")
+
+        project = self.model(**kwargs)
+        self.session.add(project)
+        await self.session.flush()
+        enqueue(self.session, "project.created", project_id=project.id, owner_id=owner_id)
+        await notify_project_change(self.session, "created", project_id=project.id, owner_id=owner_id)
+        await self.session.commit()
+        await self.session.refresh(project)
+        return project
+
+    async def _on_updated(self, row: Any) -> None:
+        await notify_project_change(self.session, "updated", project_id=row.id, owner_id=row.owner_id)
+
+    async def delete(self, id_: Any) -> bool:
+        stmt = delete(self.model).where(self.model.id == id_).returning(self.model.owner_id)
+        owner_id = (await self.session.execute(stmt)).scalar_one_or_none()
+        if owner_id is None:
+            await self.session.rollback()
+            return False
+        await self.session.execute(
+            update(User).where(User.id == owner_id).values(project_count=User.project_count - 1)
+        )
+        await notify_project_change(self.session, "deleted", project_id=id_, owner_id=owner_id)
+        await self.session.commit()
+        return True
+
+    async def apply_batch(self, owner_id: int, operations: Sequence[ProjectBatchOp]) -> List[dict]:
+        """Применяет create/update/delete одной транзакцией, по одному запросу на вид операции.
+
+        Возвращает статус для каждой операции в исходном порядке. Операции над
+        чужими или несуществующими проектами получают 404, создание сверх квоты — 403.
+        """
+        results: List[dict] = [{}] * len(operations)
+        creates, updates, deletes = [], [], []
+        seen = set()
+        for i, op in enumerate(operations):
+            if op.op != "create":
+                if op.id in seen:
+                    results[i] = {"index": i, "op": op.op, "status": 409, "id": op.id,
+                                  "detail": "Duplicate operation on project"}
+                    continue
+                seen.add(op.id)
+            {"create": creates, "update": updates, "delete": deletes}[op.op].append((i, op))
+
+        events = []
+
+        deleted = 0
+        if deletes:
+            stmt = (
+                delete(Project)
+                .where(Project.id == any_(bindparam("ids", [op.id for _, op in deletes], type_=ARRAY(Integer))),
+                       Project.owner_id == owner_id)
+                .returning(Project.id)
+                .execution_options(synchronize_session=False)
+            )
+            done = set((await self.session.execute(stmt)).scalars().all())
+            deleted = len(done)
+            for i, op in deletes:
+                if op.id in done:
+                    results[i] = {"index": i, "op": "delete", "status": 204, "id": op.id}
+                    events.append({"op": "deleted", "project_id": op.id, "owner_id": owner_id})
+                else:
+                    results[i] = {"index": i, "op": "delete", "status": 404, "id": op.id,
+                                  "detail": "Project not found"}
+
+        if updates:
+            # unnest массивов: один и тот же текст запроса для любого размера пачки
+            rows = func.unnest(
+                bindparam("ids", [op.id for _, op in updates], type_=ARRAY(Integer)),
+                bindparam("names", [op.name for _, op in updates], type_=ARRAY(String)),
+                bindparam("descriptions", [op.description for _, op in updates], type_=ARRAY(Text)),
+            ).table_valued(
+                column("id", Integer), column("name", String), column("description", Text),
+            ).render_derived(name="batch_updates")
+            stmt = (
+                update(Project)
+                .where(Project.id == rows.c.id, Project.owner_id == owner_id)
+                .values(
+                    name=func.coalesce(rows.c.name, Project.name),
+                    description=func.coalesce(rows.c.description, Project.description),
+                )
+                .returning(Project.id)
+                .execution_options(synchronize_session=False)
+            )
+            done = set((await self.session.execute(stmt)).scalars().all())
+            for i, op in updates:
+                if op.id in done:
+                    results[i] = {"index": i, "op": "update", "status": 200, "id": op.id}
+                    events.append({"op": "updated", "project_id": op.id, "owner_id": owner_id})
+                else:
+                    results[i] = {"index": i, "op": "update", "status": 404, "id": op.id,
+                                  "detail": "Project not found"}
+
+        # счётчик и квота — одним UPDATE на всю пачку
+        delta = len(creates) - deleted
+        quota_ok = True
+        if creates:
+            stmt = (
+                update(User)
+                .where(User.id == owner_id,
+                       User.project_count + delta <= get_settings().MAX_PROJECTS_PER_USER)
+                .values(project_count=User.project_count + delta)
+                .returning(User.id)
+            )
+            quota_ok = (await self.session.execute(stmt)).first() is not None
+        if (not creates or not quota_ok) and deleted:
+            await self.session.execute(
+                update(User).where(User.id == owner_id).values(project_count=User.project_count - deleted)
+            )
+
+        if creates and quota_ok:
+            stmt = insert(Project).returning(Project.id, sort_by_parameter_order=True)
+            ids = (await self.session.execute(
+                stmt,
+                [{"name": op.name, "description": op.description, "owner_id": owner_id} for _, op in creates],
+            )).scalars().all()
+            for (i, _), id_ in zip(creates, ids):
+                enqueue(self.session, "project.created", project_id=id_, owner_id=owner_id)
+                results[i] = {"index": i, "op": "create", "status": 201, "id": id_}
+                events.append({"op": "created", "project_id": id_, "owner_id": owner_id})
+        else:
+            for i, _ in creates:
+                results[i] = {"index": i, "op": "create", "status": 403, "detail": "Project quota exceeded"}
+
+        await notify_project_changes(self.session, events)
+        await self.session.commit()
+        return results
+
+    async def reconcile_project_counts(self, batch_size: int = 1000) -> int:
+        """Исправляет расхождения users.project_count с фактическим числом проектов.
+
+        Идёт батчами по id: сначала блокирует пользователей батча (FOR UPDATE),
+        затем отдельным запросом пересчитывает их проекты. Второй запрос берёт
+        свежий снимок и видит всё, что закоммитили до блокировки, а create/delete
+        этих пользователей ждут коммита батча — счётчик не затирается старым
+        значением. Возвращает количество исправленных пользователей.
+        """
+        fixed = 0
+        last_id = 0
+        while True:
+            locked = (
+                select(User.id)
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(batch_size)
+                .with_for_update()
+            )
+            ids = (await self.session.execute(locked)).scalars().all()
+            if not ids:
+                await self.session.commit()
+                return fixed
+            actual = (
+                select(func.count(Project.id))
+                .where(Project.owner_id == User.id)
+                .scalar_subquery()
+            )
+            stmt = (
+                update(User)
+                .where(User.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))),
+                       User.project_count != actual)
+                .values(project_count=actual)
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )
+            fixed += len((await self.session.execute(stmt)).all())
+            await self.session.commit()
+            last_id = ids[-1]
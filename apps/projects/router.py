@@ -1,10 +1,19 @@
+import asyncio
+import json
+from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
-from apps.projects.dto import ProjectOutDTO, ProjectCreateDTO
-from src.db.models import User, Project
+from apps.projects.dto import ProjectOutDTO, ProjectCreateDTO, ProjectBatchDTO, ProjectBatchResultDTO
+from apps.projects.repository import ProjectRepository
+from src.audit import audit_log
+from src.changefeed import project_feed
+from src.db.models import User
 from src.db.session import get_session
+from src.exceptions import QuotaExceededError
 from src.security import get_current_user
 
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -16,12 +25,64 @@ async def create_project(
         body: ProjectCreateDTO,
         session: AsyncSession = Depends(get_session),
         current_user: User = Depends(get_current_user)):
-    project = Project(
-        name=body.name,
-        description=body.description,
-        owner_id=current_user.id,
-    )
-    session.add(project)
-    await session.commit()
-    await session.refresh(project)
-    return project
\ No newline at end of file
+    try:
+        project = await ProjectRepository(session).create(
+            name=body.name,
+            description=body.description,
+            owner_id=current_user.id,
+        )
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+    await audit_log.emit("project_create", user_id=current_user.id, project_id=project.id)
+    return project
+
+
+@router.post("/batch", response_model=List[ProjectBatchResultDTO])
+async def batch_projects(
+        body: ProjectBatchDTO,
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    user_id = current_user.id
+    results = await ProjectRepository(session).apply_batch(user_id, body.operations)
+    for r in results:
+        if r["op"] == "create" and r["status"] == status.HTTP_201_CREATED:
+            await audit_log.emit("project_create", user_id=user_id, project_id=r["id"])
+    return results
+
+
+@router.get("/events")
+async def project_events(request: Request, current_user: User = Depends(get_current_user)):
+    owner_id = current_user.id
+    # LISTEN поднимаем до ответа, чтобы недоступность фида отдать честным 503
+    try:
+        await project_feed.ensure_listening()
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Change feed unavailable")
+
+    async def stream():
+        # подписка живёт ровно столько, сколько генератор: если ответ так и не начал
+        # отправляться, подписки нет, и отписывать некого
+        sub = await project_feed.subscribe(owner_id)
+        # закрытие подписки (медленный клиент, потеря LISTEN) обрываем сразу, не дожидаясь события
+        closed = asyncio.ensure_future(sub.closed.wait())
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+                get = asyncio.ensure_future(sub.queue.get())
+                done, _ = await asyncio.wait({get, closed}, timeout=15, return_when=asyncio.FIRST_COMPLETED)
+                if closed in done:
+                    get.cancel()
+                    break
+                if get not in done:
+                    get.cancel()
+                    yield ": keep-alive\n\n"
+                    continue
+                event = get.result()
+                yield f"event: {event['op']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            closed.cancel()
+            project_feed.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,68 @@
+"""Сравнение /projects/batch с N отдельными /projects/create.
+
+Нужен запущенный сервер (uvicorn main:router) и Postgres:
+
+    python -m benchmarks.project_batch --base-url http://127.0.0.1:8000 -n 50
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from uuid import uuid4
+
+
+def _post(base_url: str, path: str, body: dict, token: str | None = None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(base_url + path, data=json.dumps(body).encode(), headers=headers, method="POST")
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read() or b"null")
+
+
+def _login(base_url: str) -> str:
+    creds = {"email": f"bench-{uuid4().hex[:12]}@example.com", "password": "bench-password"}
+    _post(base_url, "/auth/register", creds)
+    return _post(base_url, "/auth/login", creds)["access_token"]
+
+
+def individual(base_url: str, token: str, n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        _post(base_url, "/projects/create", {"name": f"project {i}"}, token)
+    return time.perf_counter() - started
+
+
+def batched(base_url: str, token: str, n: int) -> float:
+    ops = [{"op": "create", "name": f"project {i}"} for i in range(n)]
+    started = time.perf_counter()
+    _post(base_url, "/projects/batch", {"operations": ops}, token)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("-n", type=int, default=50, help="projects per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    single, batch = [], []
+    for _ in range(args.rounds):
+        # новый пользователь на раунд, чтобы не упереться в квоту
+        single.append(individual(args.base_url, _login(args.base_url), args.n))
+        batch.append(batched(args.base_url, _login(args.base_url), args.n))
+
+    s, b = statistics.median(single), statistics.median(batch)
+    print(f"{args.n} x /projects/create: median {s * 1000:.1f} ms ({s / args.n * 1000:.2f} ms/project)")
+    print(f"1 x /projects/batch ({args.n} ops): median {b * 1000:.1f} ms ({b / args.n * 1000:.2f} ms/project)")
+    print(f"speedup: {s / b:.1f}x")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except urllib.error.URLError as e:
+        raise SystemExit(f"request failed: {e}")
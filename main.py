@@ -1,30 +1,115 @@
+import asyncio
 import time
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError
 
-from src.config import settings
+from src.audit import audit_log
+from src.changefeed import project_feed
+from src.concurrency import AIMDLimiter, ConcurrencyLimitMiddleware
+from src.config import get_settings
+from src.deadline import DeadlineMiddleware
+from src.metrics import metrics
 from apps.projects.router import router as project_router
 from apps.auth.router import router as auth_router
-router = FastAPI(title=settings.APP_NAME, version=settings.VERSION)
+from apps.auth.service import refresh_password_hash_metrics
 
-@router.get("/terrible-ping")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await audit_log.start()
+    interval = get_settings().PASSWORD_HASH_METRICS_INTERVAL
+    hash_metrics = asyncio.create_task(refresh_password_hash_metrics(interval)) if interval > 0 else None
+    yield
+    if hash_metrics is not None:
+        hash_metrics.cancel()
+        with suppress(asyncio.CancelledError):
+            await hash_metrics
+    await project_feed.stop()
+    await audit_log.stop()
+
+
+async def statement_timeout_handler(request: Request, exc: DBAPIError):
+    # 57014 query_canceled — сработал statement_timeout из дедлайна запроса
+    if getattr(exc.orig, "sqlstate", None) == "57014" or getattr(exc.orig, "pgcode", None) == "57014":
+        metrics.incr("deadline.statement_timeouts")
+        return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+    raise exc
+
+
+ping_router = APIRouter()
+
+
+@ping_router.get("/terrible-ping")
 async def terrible_ping():
     time.sleep(5)  # I/O blocking operation for 10 seconds, the whole process will be blocked
 
     return {"pong": True}
 
 
-@router.get("/good-ping")
+@ping_router.get("/good-ping")
 async def good_ping():
     time.sleep(5)  # I/O blocking operation for 10 seconds, but in a separate thread for the whole `good_ping` route
 
     return {"pong": True}
 
 
-@router.get("/perfect-ping")
+@ping_router.get("/perfect-ping")
 async def perfect_ping():
     return {"pong": True}
 
 
-router.include_router(project_router)
-router.include_router(auth_router)
\ No newline at end of file
+@ping_router.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+
+def create_app() -> FastAPI:
+    # настройки читаются здесь, а не при импорте модуля
+    settings = get_settings()
+    app = FastAPI(title=settings.APP_NAME, version=settings.VERSION, lifespan=lifespan)
+    app.add_middleware(
+        DeadlineMiddleware,
+        default=settings.REQUEST_TIMEOUT_SECONDS,
+        routes={
+            "/auth/login": 5.0,
+            "/auth/register": 5.0,
+            "/projects/events": None,  # долгоживущий SSE-поток
+        },
+    )
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limiters={
+            # bcrypt + запись в БД: мало и дорого
+            "expensive": AIMDLimiter("expensive", target_latency=0.5, initial_limit=4, max_limit=16),
+            "default": AIMDLimiter("default", target_latency=0.1, initial_limit=10, max_limit=50),
+        },
+        routes={
+            "/auth/login": "expensive",
+            "/auth/register": "expensive",
+            "/projects/batch": "expensive",
+            "/projects/events": None,
+            "/metrics": None,
+        },
+        default="default",
+    )
+    app.add_exception_handler(DBAPIError, statement_timeout_handler)
+    app.include_router(ping_router)
+    app.include_router(project_router)
+    app.include_router(auth_router)
+    return app
+
+
+@lru_cache
+def _default_app() -> FastAPI:
+    return create_app()
+
+
+def __getattr__(name: str):
+    # `uvicorn main:router` продолжает работать: приложение собирается при первом обращении
+    if name == "router":
+        return _default_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from src.db.models import AuditEvent
+from src.db.session import get_sessionmaker
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """Асинхронная очередь аудита с пакетной записью.
+
+    `emit` кладёт событие в ограниченную очередь и не ходит в БД. Фоновая
+    задача копит события и пишет их одним multi-row INSERT, когда набралось
+    `batch_size` событий или прошло `flush_interval` секунд. При полной
+    очереди `emit` ждёт до `put_timeout` секунд (backpressure), после чего
+    событие отбрасывается и учитывается в `audit.dropped`.
+    """
+
+    def __init__(self, *, max_queue: int = 10_000, batch_size: int = 500,
+                 flush_interval: float = 1.0, put_timeout: float = 0.05, stop_timeout: float = 10.0):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.stop_timeout = stop_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        # воркер не отменяем: он сам дописывает очередь и выходит, увидев флаг
+        self._stopping.set()
+        try:
+            async with asyncio.timeout(self.stop_timeout):
+                await self._worker
+        except TimeoutError:
+            self._worker.cancel()
+            lost = self._queue.qsize()
+            metrics.incr("audit.dropped", lost)
+            logger.error("Audit log did not drain in %.0fs, dropping %d events", self.stop_timeout, lost)
+        self._worker = None
+        self._queue = None
+
+    async def emit(self, event_type: str, *, user_id: Optional[int] = None, **payload) -> None:
+        row = {
+            "event_type": event_type,
+            "user_id": user_id,
+            "payload": payload or None,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if self._queue is None or self._stopping.is_set():
+            metrics.incr("audit.dropped")
+            return
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            metrics.incr("audit.backpressure")
+            try:
+                async with asyncio.timeout(self.put_timeout):
+                    await self._queue.put(row)
+            except TimeoutError:
+                metrics.incr("audit.dropped")
+                return
+        metrics.incr("audit.enqueued")
+        metrics.set("audit.queue_depth", self._queue.qsize())
+
+    async def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                # ограниченное ожидание, чтобы регулярно проверять флаг остановки
+                async with asyncio.timeout(self.flush_interval):
+                    batch = [await self._queue.get()]
+            except TimeoutError:
+                continue
+            try:
+                async with asyncio.timeout(self.flush_interval):
+                    while len(batch) < self.batch_size:
+                        if self._stopping.is_set():
+                            # при остановке не ждём новых событий, только добираем очередь
+                            while len(batch) < self.batch_size and not self._queue.empty():
+                                batch.append(self._queue.get_nowait())
+                            break
+                        batch.append(await self._queue.get())
+            except TimeoutError:
+                pass
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            async with get_sessionmaker()() as session:
+                await session.execute(insert(AuditEvent).values(batch))
+                await session.commit()
+        except Exception:
+            logger.exception("Failed to flush %d audit events", len(batch))
+            metrics.incr("audit.dropped", len(batch))
+            return
+        metrics.incr("audit.flushed", len(batch))
+        metrics.incr("audit.batches")
+        metrics.incr("audit.flush_seconds", time.perf_counter() - started)
+        metrics.set("audit.queue_depth", self._queue.qsize())
+
+
+audit_log = AuditLog()
@@ -0,0 +1,61 @@
+"""Подбор cost-фактора bcrypt под целевое время проверки пароля на этом хосте.
+
+    python -m src.calibrate --target-ms 250
+
+Найденное значение выставляется в BCRYPT_ROUNDS; существующие хэши
+пересчитаются при следующем успешном логине.
+"""
+import argparse
+import statistics
+import sys
+import time
+from typing import Optional
+
+from passlib.hash import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+def measure_verify(rounds: int, samples: int) -> float:
+    hashed = bcrypt.using(rounds=rounds).hash("calibration-password")
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        bcrypt.verify("calibration-password", hashed)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate(target_seconds: float, samples: int = 5) -> Optional[int]:
+    """Наибольший cost, при котором медианная проверка укладывается в target.
+
+    None — если даже MIN_ROUNDS не укладывается.
+    """
+    best = None
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure_verify(rounds, samples)
+        print(f"rounds={rounds:<3} verify={elapsed * 1000:8.1f} ms")
+        if elapsed > target_seconds:
+            break
+        best = rounds
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    rounds = calibrate(args.target_ms / 1000, args.samples)
+    if rounds is None:
+        print(f"\nrounds={MIN_ROUNDS} already exceeds {args.target_ms:.0f} ms on this host; "
+              f"refusing to go below the minimum cost. Raise --target-ms or use faster hardware.",
+              file=sys.stderr)
+        sys.exit(1)
+    print(f"\nBCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Лента изменений проектов через Postgres LISTEN/NOTIFY.
+
+Пишущие пути вызывают `notify_project_change` внутри своей транзакции —
+Postgres доставит уведомление только после коммита. На воркер открывается
+одно LISTEN-соединение (лениво, при первом подписчике), события раздаются
+подписчикам с тем же `owner_id` через ограниченные очереди. Подписчик,
+который не успевает читать, отключается.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Set
+
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import Text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "project_changes"
+
+
+async def notify_project_change(session: AsyncSession, op: str, *, project_id: int, owner_id: int) -> None:
+    payload = json.dumps({"op": op, "project_id": project_id, "owner_id": owner_id})
+    await session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+async def notify_project_changes(session: AsyncSession, events: Iterable[dict]) -> None:
+    """Пачка уведомлений одним запросом (events: op, project_id, owner_id)."""
+    payloads = [json.dumps(e) for e in events]
+    if not payloads:
+        return
+    stmt = text("SELECT pg_notify(:channel, p) FROM unnest(:payloads) AS p").bindparams(
+        bindparam("payloads", type_=ARRAY(Text)),
+    )
+    await session.execute(stmt, {"channel": CHANNEL, "payloads": payloads})
+
+
+class Subscription:
+    def __init__(self, owner_id: int, buffer_size: int):
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.closed = asyncio.Event()
+
+    def push(self, event: dict) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class ProjectChangeFeed:
+    def __init__(self, *, buffer_size: int = 100):
+        self.buffer_size = buffer_size
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, owner_id: int) -> Subscription:
+        await self.ensure_listening()
+        sub = Subscription(owner_id, self.buffer_size)
+        self._subscribers[owner_id].add(sub)
+        metrics.incr("changefeed.subscribers")
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.owner_id)
+        if subs and sub in subs:
+            subs.discard(sub)
+            if not subs:
+                del self._subscribers[sub.owner_id]
+            metrics.incr("changefeed.subscribers", -1)
+        sub.closed.set()
+
+    async def stop(self) -> None:
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                self.unsubscribe(sub)
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await conn.close()
+
+    async def ensure_listening(self) -> None:
+        if self._conn is not None:
+            return
+        async with self._lock:
+            if self._conn is not None:
+                return
+            import asyncpg
+
+            dsn = get_settings().DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://", 1)
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(CHANNEL, self._on_notify)
+            conn.add_termination_listener(self._on_terminated)
+            self._conn = conn
+
+    def _on_terminated(self, conn) -> None:
+        # соединение потеряно: отключаем всех, клиенты переподключатся и поднимут LISTEN заново
+        logger.warning("LISTEN connection lost, disconnecting change feed subscribers")
+        self._conn = None
+        for subs in list(self._subscribers.values()):
+            for sub in list(subs):
+                self.unsubscribe(sub)
+
+    def _on_notify(self, conn, pid: int, channel: str, payload: str) -> None:
+        metrics.incr("changefeed.notifications")
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Malformed change feed payload: %r", payload)
+            return
+        for sub in list(self._subscribers.get(event.get("owner_id"), ())):
+            if sub.push(event):
+                metrics.incr("changefeed.delivered")
+            else:
+                metrics.incr("changefeed.slow_consumer_disconnects")
+                self.unsubscribe(sub)
+
+
+project_feed = ProjectChangeFeed()
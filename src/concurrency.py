@@ -0,0 +1,87 @@
+"""Адаптивное ограничение конкурентности (AIMD) и сброс нагрузки.
+
+Для каждого бюджета держим текущий лимит одновременных запросов. Запрос,
+пришедший сверх лимита, сразу получает 503 с Retry-After вместо ожидания
+соединения в пуле. После каждого запроса лимит корректируется: если
+задержка ниже целевой — растёт аддитивно, если выше или ответ 5xx —
+уменьшается мультипликативно.
+"""
+import math
+import time
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import metrics
+from src.routing import match_prefix
+
+
+class AIMDLimiter:
+    def __init__(self, name: str, *, target_latency: float, initial_limit: int = 10,
+                 min_limit: int = 1, max_limit: int = 100, backoff_ratio: float = 0.9):
+        self.name = name
+        self.target_latency = target_latency
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.inflight = 0
+
+    def try_acquire(self) -> bool:
+        if self.inflight >= math.floor(self.limit):
+            return False
+        self.inflight += 1
+        return True
+
+    def release(self, latency: float, *, overloaded: bool) -> None:
+        self.inflight -= 1
+        if overloaded or latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif self.inflight + 1 >= math.floor(self.limit):
+            # растём только когда лимит реально упирался
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        metrics.set(f"concurrency.{self.name}.limit", round(self.limit, 2))
+        metrics.set(f"concurrency.{self.name}.inflight", self.inflight)
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app: ASGIApp, *, limiters: Dict[str, AIMDLimiter],
+                 routes: Dict[str, Optional[str]], default: str, retry_after: int = 1):
+        self.app = app
+        self.limiters = limiters
+        self.routes = routes
+        self.default = default
+        self.retry_after = retry_after
+
+    def _limiter_for(self, path: str) -> Optional[AIMDLimiter]:
+        name = match_prefix(self.routes, path, self.default)
+        return self.limiters[name] if name is not None else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self._limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not limiter.try_acquire():
+            metrics.incr(f"concurrency.{limiter.name}.shed")
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"retry-after", str(self.retry_after).encode())]})
+            await send({"type": "http.response.body", "body": b'{"detail":"Server overloaded"}'})
+            return
+
+        status_code = 500
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            # 503/504 ниже по стеку — признак перегрузки (дедлайн, пул соединений)
+            limiter.release(time.monotonic() - started, overloaded=status_code in (503, 504))
@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,9 +14,35 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int
     SECRET_KEY: str
 
+    MAX_PROJECTS_PER_USER: int = 100
+
+    # подбирается командой `python -m src.calibrate`
+    BCRYPT_ROUNDS: int = 12
+
+    REQUEST_TIMEOUT_SECONDS: float = 10.0
+
+    # период пересчёта auth.password_hashes в /metrics каждым воркером; 0 — выключено
+    PASSWORD_HASH_METRICS_INTERVAL: float = 300.0
+
+    OUTBOX_WEBHOOK_URL: Optional[str] = None
+    OUTBOX_WEBHOOK_TOPICS: List[str] = ["user.registered", "project.created"]
+    OUTBOX_WEBHOOK_TIMEOUT: float = 5.0
+    OUTBOX_RETENTION_DAYS: int = 7
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8"
     )
 
-settings = Settings()
+
+# .env читается при первом обращении, а не при импорте модуля
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+def __getattr__(name: str):
+    # обратная совместимость для `from src.config import settings`
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
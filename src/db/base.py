@@ -3,6 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy import MetaData, select, update, delete
 
+from src.db.singleflight import get_by_id
+
 NAMING_CONVENTION = {
     "ix": "ix_%(column_0_label)s",
     "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -22,9 +24,7 @@ class BaseRepository(Generic[T]):
         self.model = model
 
     async def get_one(self, id_: Any) -> Optional[T]:
-        stmt = select(self.model).where(self.model.id == id_)
-        res = await self.session.execute(stmt)
-        return res.scalars().one_or_none()
+        return await get_by_id(self.session, self.model, id_)
 
     async def get_all(self) -> List[T]:
         stmt = select(self.model)
@@ -40,14 +40,22 @@ class BaseRepository(Generic[T]):
         return obj
 
     async def update(self, id_: Any, **kwargs) -> T:
-        stmt = update(self.model).where(self.model.id == id_).values(**kwargs).returning(self.model.id)
-        res = await self.session.execute(stmt)
-        if not res.first():
+        stmt = update(self.model).where(self.model.id == id_).values(**kwargs).returning(*self.model.__table__.c)
+        row = (await self.session.execute(stmt)).first()
+        if row is None:
             await self.session.rollback()
             return None
+        await self._on_updated(row)
         await self.session.commit()
-        return await self.get_one(id_)
+        return await self._reload(id_)
+
+    async def _on_updated(self, row: Any) -> None:
+        """Вызывается в транзакции update до коммита; row — обновлённая строка таблицы."""
 
+    async def _reload(self, id_: Any) -> Optional[T]:
+        # сразу после записи читаем в своей сессии, а не через single-flight
+        res = await self.session.execute(select(self.model).where(self.model.id == id_))
+        return res.scalars().one_or_none()
 
     async def delete(self, id_: Any) -> bool:
         stmt = delete(self.model).where(self.model.id == id_)
@@ -0,0 +1,164 @@
+"""Хелперы для онлайн-миграций на больших таблицах.
+
+- индексы создаются/удаляются `CONCURRENTLY` в autocommit-блоке, вне
+  транзакции миграции;
+- бэкфиллы идут батчами по диапазонам первичного ключа, каждый батч —
+  отдельная короткая транзакция, с паузой между батчами;
+- `alembic/env.py` выставляет `lock_timeout`, так что DDL падает, а не
+  встаёт в очередь за долгой транзакцией (и не блокирует всех за собой);
+- хелперы с autocommit-блоком коммитят транзакцию миграции, в которой они
+  вызваны, — всё, что было до них, закоммитится без записи номера ревизии,
+  а упавший после них шаг при повторе наткнётся на уже применённый DDL.
+  Поэтому такой хелпер — последний (лучше единственный) шаг ревизии,
+  а бэкфилл идёт отдельной ревизией после DDL;
+- `alembic -x dry_run=true upgrade head` ничего не выполняет: каждый шаг
+  (и обычный `op.*`, и хелперы) только пишется в лог вместе с оценкой
+  числа строк в целевой таблице.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from alembic import context, op
+from alembic.ddl.base import AlterTable
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateTable, DDLElement
+
+logger = logging.getLogger("alembic.online")
+
+
+def is_dry_run() -> bool:
+    return bool(context.config.attributes.get("dry_run"))
+
+
+def estimate_rows(table: str, where: Optional[str] = None, *,
+                  bind: Optional[Connection] = None) -> Optional[int]:
+    """Оценка числа строк по плану запроса, без полного сканирования.
+
+    None — если оценить нельзя (offline-режим, таблицы или колонки ещё нет).
+    """
+    if bind is None:
+        if context.is_offline_mode():
+            return None
+        bind = op.get_bind()
+    sql = f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table}"
+    if where:
+        sql += f" WHERE {where}"
+    try:
+        # savepoint: ошибка EXPLAIN не должна ломать транзакцию dry-run
+        with bind.begin_nested():
+            plan = bind.execute(text(sql)).scalar()
+    except DBAPIError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _target_table(construct) -> Optional[str]:
+    if isinstance(construct, CreateTable):
+        return None  # новая таблица пуста
+    if isinstance(construct, AlterTable):
+        return construct.table_name
+    element = getattr(construct, "element", None) if isinstance(construct, DDLElement) else None
+    if isinstance(element, Table):
+        return element.name
+    if element is not None and isinstance(getattr(element, "table", None), Table):
+        return element.table.name  # CreateIndex / DropIndex
+    table = getattr(construct, "table", None)  # insert/update/delete
+    return table.name if isinstance(table, Table) else None
+
+
+def install_dry_run(migration_context: MigrationContext) -> None:
+    """Подменяет выполнение шагов миграции логированием SQL и оценки строк."""
+    impl = migration_context.impl
+    bind = migration_context.connection
+
+    def log_only(construct, execution_options=None, multiparams=None, params=None):
+        if isinstance(construct, str):
+            construct = text(construct)
+        sql = str(construct.compile(dialect=impl.dialect)).strip()
+        table = _target_table(construct)
+        rows = estimate_rows(table, bind=bind) if table and bind is not None else None
+        logger.info("[dry-run] %s\n    -> ~%s rows in %s", sql, rows if rows is not None else "?", table or "-")
+        return None
+
+    impl._exec = log_only
+
+
+def _report(step: str, table: str, where: Optional[str] = None) -> None:
+    logger.info("[dry-run] %s: ~%s rows in %s", step, estimate_rows(table, where), table)
+
+
+def create_index_concurrently(index_name: str, table: str, columns: Sequence[str], **kw) -> None:
+    if is_dry_run():
+        _report(f"create index {index_name}", table)
+        return
+    with op.get_context().autocommit_block():
+        op.create_index(index_name, table, list(columns), postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(index_name: str, table: str) -> None:
+    if is_dry_run():
+        _report(f"drop index {index_name}", table)
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+@contextmanager
+def _explicit_transaction(bind: Connection) -> Iterator[None]:
+    # внутри autocommit_block каждый запрос коммитится сам по себе
+    bind.exec_driver_sql("BEGIN")
+    try:
+        yield
+    except BaseException:
+        bind.exec_driver_sql("ROLLBACK")
+        raise
+    bind.exec_driver_sql("COMMIT")
+
+
+def backfill_in_batches(table: str, set_clause: str, *, where: Optional[str] = None,
+                        pk: str = "id", batch_size: int = 5_000, pause: float = 0.1,
+                        lock_rows: bool = False) -> int:
+    """UPDATE {table} SET {set_clause} батчами по диапазонам {pk}.
+
+    Каждый батч коммитится отдельно, так что блокировки строк держатся
+    недолго, а пауза между батчами даёт отдышаться репликам и автовакууму.
+    lock_rows=True — для SET с подзапросом к таблицам, которые приложение
+    меняет прямо сейчас: строки батча сперва блокируются SELECT ... FOR UPDATE,
+    и UPDATE следующим запросом считает подзапрос по свежему снимку.
+    Возвращает число обновлённых строк.
+    """
+    if is_dry_run():
+        _report(f"backfill {table} SET {set_clause}", table, where)
+        return 0
+
+    condition = f" AND ({where})" if where else ""
+    stmt = text(f"UPDATE {table} SET {set_clause} WHERE {pk} >= :lo AND {pk} < :hi{condition}")
+    lock = text(f"SELECT {pk} FROM {table} WHERE {pk} >= :lo AND {pk} < :hi ORDER BY {pk} FOR UPDATE")
+    total = 0
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        lo, max_pk = bind.execute(text(f"SELECT min({pk}), max({pk}) FROM {table}")).one()
+        if lo is None:
+            return 0
+        while lo <= max_pk:
+            hi = lo + batch_size
+            params = {"lo": lo, "hi": hi}
+            if lock_rows:
+                with _explicit_transaction(bind):
+                    bind.execute(lock, params)
+                    total += bind.execute(stmt, params).rowcount or 0
+            else:
+                total += bind.execute(stmt, params).rowcount or 0
+            lo = hi
+            if pause:
+                time.sleep(pause)
+    logger.info("backfilled %d rows in %s", total, table)
+    return total
@@ -1,15 +1,35 @@
+from functools import lru_cache
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import Session
 
-from src.config import settings
+from src.config import get_settings
+from src.deadline import remaining
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True, pool_pre_ping=True)
 
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# engine создаётся при первой сессии, а не при импорте модуля
+@lru_cache
+def get_engine() -> AsyncEngine:
+    return create_async_engine(get_settings().DATABASE_URL, echo=True, pool_pre_ping=True)
+
+
+@lru_cache
+def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_engine(), expire_on_commit=False, class_=AsyncSession)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_request_deadline(session, transaction, connection) -> None:
+    # оставшийся бюджет запроса -> statement_timeout на время транзакции
+    budget = remaining()
+    if budget is not None:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(budget * 1000), 1)}")
+
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
+    async with get_sessionmaker()() as session:
         try:
             yield session
         except Exception as e:
@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Type, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.util import identity_key
+
+from src.db.session import get_sessionmaker
+from src.metrics import metrics
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые вызовы в один.
+
+    Первый вызов по ключу запускает `fn` в отдельной задаче, остальные ждут
+    её же результат. Отмена одного ожидающего не отменяет запрос для других;
+    задача отменяется только когда от неё отказались все ожидающие.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            metrics.incr(f"{self.name}.executed")
+        else:
+            metrics.incr(f"{self.name}.coalesced")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # никто больше не ждёт — отменяем запрос и не отдаём его новым вызовам
+                self._forget(key, call)
+                call.task.cancel()
+                metrics.incr(f"{self.name}.cancelled")
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+db_reads = SingleFlight("singleflight.db_reads")
+
+
+def _holds_connection(session: AsyncSession) -> bool:
+    # in_transaction() не годится: merge() сам открывает транзакцию сессии, но без
+    # соединения — тогда следующие чтения в этом запросе тоже можно объединять.
+    # Публичного API «есть ли соединение» у SessionTransaction нет.
+    trans = session.sync_session.get_transaction()
+    return trans is not None and bool(trans._connections)
+
+
+async def get_by_id(session: AsyncSession, model: Type[T], id_: Any) -> Optional[T]:
+    """SELECT по первичному ключу, общий для одновременных одинаковых запросов.
+
+    Объединяются только чтения из «чистой» сессии: без взятого из пула
+    соединения, несохранённых изменений и без этого объекта в identity map. Тогда запрос
+    выполняется в собственной короткой сессии, а результат привязывается к
+    сессии вызывающего через `merge(load=False)`. Иначе читаем в сессии
+    вызывающего — не занимаем второе соединение из пула и видим свои записи.
+    """
+    if (_holds_connection(session) or session.new or session.dirty or session.deleted
+            or identity_key(model, id_) in session.identity_map):
+        res = await session.execute(select(model).where(model.id == id_))
+        return res.scalars().one_or_none()
+
+    async def load() -> Optional[T]:
+        async with get_sessionmaker()() as own_session:
+            res = await own_session.execute(select(model).where(model.id == id_))
+            return res.scalars().one_or_none()
+
+    obj = await db_reads.do((model.__name__, id_), load)
+    if obj is None:
+        return None
+    return await session.merge(obj, load=False)
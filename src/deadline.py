@@ -0,0 +1,119 @@
+"""Дедлайны запросов.
+
+`DeadlineMiddleware` ограничивает время обработки запроса (глобально и для
+отдельных путей), отменяет обработчик по истечении дедлайна или при
+отключении клиента. Оставшийся бюджет доступен через `remaining()` —
+`src.db.session` превращает его в `SET LOCAL statement_timeout` для каждой
+транзакции, так что запрос в БД не переживает HTTP-запрос.
+"""
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import metrics
+from src.routing import match_prefix
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Сколько секунд осталось до дедлайна текущего запроса (None — без дедлайна)."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _has_body(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"transfer-encoding":
+            return True
+        if name == b"content-length":
+            return value.strip() != b"0"
+    return False
+
+
+class DeadlineMiddleware:
+    def __init__(self, app: ASGIApp, *, default: Optional[float],
+                 routes: Optional[Dict[str, Optional[float]]] = None):
+        self.app = app
+        self.default = default
+        self.routes = routes or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timeout = match_prefix(self.routes, scope["path"], self.default)
+
+        response_started = False
+        body_done = False
+        disconnected = asyncio.Event()
+        watcher: Optional[asyncio.Task] = None
+        handler: Optional[asyncio.Task] = None
+        buffered: List[Message] = []
+
+        async def watch_disconnect() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    if handler is not None and not handler.done():
+                        metrics.incr("deadline.client_disconnects")
+                        handler.cancel()
+                    return
+
+        async def wrapped_receive() -> Message:
+            nonlocal body_done, watcher
+            if buffered:
+                return buffered.pop()
+            if body_done:
+                # тело уже прочитано — дальше receive слушает только watcher
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                disconnected.set()
+            elif not message.get("more_body", False):
+                body_done = True
+                watcher = asyncio.create_task(watch_disconnect())
+            return message
+
+        async def wrapped_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        if timeout is not None:
+            _deadline.set(time.monotonic() + timeout)
+        if not _has_body(scope):
+            # обработчик может вообще не вызвать receive (GET и т.п.) — тогда
+            # забираем пустое тело сами и слушаем отключение клиента сразу
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                metrics.incr("deadline.client_disconnects")
+                return
+            buffered.append(message)
+            body_done = True
+        handler = asyncio.ensure_future(self.app(scope, wrapped_receive, wrapped_send))
+        if body_done:
+            watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await asyncio.wait_for(handler, timeout)
+        except asyncio.TimeoutError:
+            metrics.incr("deadline.timeouts")
+            if not response_started and not disconnected.is_set():
+                await send({"type": "http.response.start", "status": 504,
+                            "headers": [(b"content-type", b"application/json")]})
+                await send({"type": "http.response.body", "body": b'{"detail":"Request deadline exceeded"}'})
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                handler.cancel()
+                raise
+        finally:
+            if watcher is not None:
+                watcher.cancel()
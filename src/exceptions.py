@@ -1,4 +1,10 @@
 class NotFoundError(Exception):
     def __init__(self, message: str):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class QuotaExceededError(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from threading import Lock
+from typing import Dict
+
+
+class Metrics:
+    """Простейший in-process реестр счётчиков (на воркер)."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._lock = Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self._counters[name] = value
+
+    def replace(self, prefix: str, values: Dict[str, float]) -> None:
+        """Атомарно заменяет все счётчики `prefix.*` новым набором."""
+        with self._lock:
+            for name in [n for n in self._counters if n.startswith(prefix + ".")]:
+                del self._counters[name]
+            for key, value in values.items():
+                self._counters[f"{prefix}.{key}"] = value
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+
+metrics = Metrics()
@@ -0,0 +1,210 @@
+"""Транзакционный outbox и пул фоновых воркеров.
+
+Задание пишется через `enqueue` в той же сессии и транзакции, что и
+основная вставка, поэтому оно появляется только вместе с закоммиченными
+данными. Воркеры забирают задания через `SELECT ... FOR UPDATE SKIP LOCKED`
+и выполняют обработчик, пока держат блокировку строки: если процесс упадёт,
+транзакция откатится и задание снова станет доступным.
+
+Доставка настраивается через OUTBOX_WEBHOOK_URL: задания из
+OUTBOX_WEBHOOK_TOPICS отправляются туда JSON-POST'ом. Для топиков без
+настроенной доставки `enqueue` ничего не пишет. Выполненные и упавшие
+задания воркер удаляет через OUTBOX_RETENTION_DAYS дней.
+
+Запуск локально (нужен Postgres из DATABASE_URL):
+
+    OUTBOX_WEBHOOK_URL=http://localhost:9000/hooks python -m src.outbox --workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+from src.db.models import OutboxJob
+from src.db.session import get_sessionmaker
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def handler(topic: str) -> Callable[[Handler], Handler]:
+    def decorator(fn: Handler) -> Handler:
+        _handlers[topic] = fn
+        return fn
+    return decorator
+
+
+def is_enabled(topic: str) -> bool:
+    settings = get_settings()
+    return bool(settings.OUTBOX_WEBHOOK_URL) and topic in settings.OUTBOX_WEBHOOK_TOPICS
+
+
+def enqueue(session: AsyncSession, topic: str, **payload) -> Optional[OutboxJob]:
+    """Добавляет задание в текущую транзакцию; коммит остаётся за вызывающим.
+
+    Если доставка топика не настроена, задание не создаётся — его некому забрать.
+    """
+    if not is_enabled(topic):
+        return None
+    job = OutboxJob(topic=topic, payload=payload, status="pending", attempts=0)
+    session.add(job)
+    return job
+
+
+def webhook_handler(topic: str, url: str, *, timeout: float) -> Handler:
+    """Обработчик, отправляющий задание POST-запросом; не-2xx ответ — ошибка и ретрай."""
+
+    def post(payload: dict) -> None:
+        body = json.dumps({"topic": topic, "payload": payload}).encode()
+        req = urllib.request.Request(url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json", "X-Outbox-Topic": topic})
+        # urlopen бросает HTTPError на 4xx/5xx
+        with urllib.request.urlopen(req, timeout=timeout):
+            pass
+
+    async def deliver(payload: dict) -> None:
+        await asyncio.to_thread(post, payload)
+
+    return deliver
+
+
+def register_configured_handlers() -> None:
+    settings = get_settings()
+    if not settings.OUTBOX_WEBHOOK_URL:
+        return
+    for topic in settings.OUTBOX_WEBHOOK_TOPICS:
+        handler(topic)(webhook_handler(topic, settings.OUTBOX_WEBHOOK_URL,
+                                       timeout=settings.OUTBOX_WEBHOOK_TIMEOUT))
+
+
+class OutboxWorker:
+    def __init__(self, *, concurrency: int = 4, poll_interval: float = 1.0,
+                 max_attempts: int = 8, base_backoff: float = 2.0, max_backoff: float = 3600.0,
+                 retention: timedelta = timedelta(days=7), purge_interval: float = 3600.0,
+                 purge_batch: int = 1000):
+        self.concurrency = concurrency
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.purge_batch = purge_batch
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+    async def run(self) -> None:
+        await asyncio.gather(self._purge_loop(), *(self._loop() for _ in range(self.concurrency)))
+
+    async def _purge_loop(self) -> None:
+        while True:
+            try:
+                purged = await self.purge()
+                if purged:
+                    logger.info("Purged %d finished outbox jobs", purged)
+            except Exception:
+                logger.exception("Outbox purge failed")
+            await asyncio.sleep(self.purge_interval)
+
+    async def purge(self) -> int:
+        """Удаляет done/failed задания старше retention, батчами по purge_batch."""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        total = 0
+        while True:
+            async with get_sessionmaker()() as session:
+                ids = (
+                    select(OutboxJob.id)
+                    .where(OutboxJob.status.in_(("done", "failed")), OutboxJob.created_at < cutoff)
+                    .limit(self.purge_batch)
+                    .scalar_subquery()
+                )
+                res = await session.execute(delete(OutboxJob).where(OutboxJob.id.in_(ids)))
+                await session.commit()
+            deleted = res.rowcount or 0
+            total += deleted
+            metrics.incr("outbox.purged", deleted)
+            if deleted < self.purge_batch:
+                return total
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                processed = await self.process_one()
+            except Exception:
+                logger.exception("Outbox worker iteration failed")
+                processed = False
+            if not processed:
+                await asyncio.sleep(self.poll_interval)
+
+    async def process_one(self) -> bool:
+        async with get_sessionmaker()() as session:
+            stmt = (
+                select(OutboxJob)
+                .where(OutboxJob.status == "pending", OutboxJob.available_at <= func.now(),
+                       OutboxJob.topic.in_(list(_handlers)))
+                .order_by(OutboxJob.available_at, OutboxJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = (await session.execute(stmt)).scalars().one_or_none()
+            if job is None:
+                await session.rollback()
+                return False
+
+            fn = _handlers.get(job.topic)
+            try:
+                if fn is None:
+                    raise LookupError(f"No handler for topic {job.topic!r}")
+                await fn(job.payload)
+            except Exception as e:
+                self._schedule_retry(job, e)
+            else:
+                job.status = "done"
+                job.attempts += 1
+                metrics.incr("outbox.done")
+            await session.commit()
+            return True
+
+    def _schedule_retry(self, job: OutboxJob, error: Exception) -> None:
+        job.attempts += 1
+        job.last_error = repr(error)
+        if job.attempts >= self.max_attempts:
+            job.status = "failed"
+            metrics.incr("outbox.failed")
+            logger.error("Outbox job %s (%s) failed permanently: %r", job.id, job.topic, error)
+            return
+        delay = min(self.base_backoff * 2 ** (job.attempts - 1), self.max_backoff)
+        job.available_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        metrics.incr("outbox.retried")
+        logger.warning("Outbox job %s (%s) failed, retry in %.0fs: %r", job.id, job.topic, delay, error)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run outbox workers")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--max-attempts", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    register_configured_handlers()
+    if not _handlers:
+        raise SystemExit("No outbox handlers configured (set OUTBOX_WEBHOOK_URL)")
+
+    worker = OutboxWorker(concurrency=args.workers, poll_interval=args.poll_interval,
+                          max_attempts=args.max_attempts,
+                          retention=timedelta(days=get_settings().OUTBOX_RETENTION_DAYS))
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 from fastapi import Depends, HTTPException
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from src.db.enums import UserRole
 from src.db.models import User, Project
 from src.db.session import get_session
+from src.db.singleflight import get_by_id
 from src.security import get_current_user
 
 
@@ -15,8 +15,7 @@ async def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 async def get_project_or_404(project_id: int, session: AsyncSession = Depends(get_session)) -> Project:
-    result = await session.execute(select(Project).where(Project.id == project_id).limit(1))
-    project = result.scalar_one_or_none()
+    project = await get_by_id(session, Project, project_id)
     if not project:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found")
     return project
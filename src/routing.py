@@ -0,0 +1,12 @@
+from typing import Mapping, TypeVar
+
+V = TypeVar("V")
+
+
+def match_prefix(routes: Mapping[str, V], path: str, default: V) -> V:
+    """Значение для самого длинного префикса из routes, с которого начинается path."""
+    best = None
+    for prefix in routes:
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return routes[best] if best is not None else default
@@ -1,28 +1,78 @@
+import asyncio
+import logging
 from datetime import datetime, timezone, timedelta
-from typing import Literal, Optional, Dict, Annotated
+from functools import lru_cache
+from typing import Literal, Optional, Dict, Annotated, Set, TYPE_CHECKING
 from uuid import uuid4
 
 from fastapi import Depends, HTTPException, Header
-from jose import jwt
-from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.config import settings
+from src.config import get_settings
 from src.db.models import User
-from src.db.session import get_session
+from src.db.session import get_session, get_sessionmaker
+from src.db.singleflight import get_by_id
+from src.metrics import metrics
 
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto"
-)
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+# passlib/bcrypt и jose тяжёлые при импорте — грузим их при первом использовании
+@lru_cache
+def get_pwd_context() -> "CryptContext":
+    from passlib.context import CryptContext
+
+    rounds = get_settings().BCRYPT_ROUNDS
+    # min = max = rounds: хэши с любым другим cost считаются устаревшими и пересчитываются при логине
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return get_pwd_context().needs_update(hashed_password)
+
+
+_rehash_tasks: Set[asyncio.Task] = set()
+
+def schedule_rehash(user_id: int, plain_password: str, old_hash: str) -> None:
+    """Пересчитывает хэш пароля в фоне, не задерживая ответ на логин."""
+    task = asyncio.create_task(_rehash(user_id, plain_password, old_hash))
+    _rehash_tasks.add(task)
+    task.add_done_callback(_rehash_tasks.discard)
+    metrics.incr("auth.rehash.scheduled")
+
+async def _rehash(user_id: int, plain_password: str, old_hash: str) -> None:
+    try:
+        # bcrypt — CPU-bound, уводим из event loop
+        new_hash = await asyncio.to_thread(hash_password, plain_password)
+        async with get_sessionmaker()() as session:
+            # compare-and-set: не затираем пароль, если его успели сменить
+            res = await session.execute(
+                update(User)
+                .where(User.id == user_id, User.password == old_hash)
+                .values(password=new_hash)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        metrics.incr("auth.rehash.done" if res.rowcount else "auth.rehash.skipped")
+    except Exception:
+        metrics.incr("auth.rehash.failed")
+        logger.exception("Password rehash failed for user %s", user_id)
 
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
@@ -51,15 +101,21 @@ def create_jwt(*, sub: str, token_type: Literal["access", "refresh"] = "access",
     if extra_claims:
         payload.update(extra_claims)
 
+    from jose import jwt
+
+    settings = get_settings()
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 def create_access_token(*, sub: str) -> str:
-    return create_jwt(sub=sub, token_type="access", minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return create_jwt(sub=sub, token_type="access", minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES)
 
 def create_refresh_token(*, sub: str) -> str:
-    return create_jwt(sub=sub, token_type="refresh", days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return create_jwt(sub=sub, token_type="refresh", days=get_settings().REFRESH_TOKEN_EXPIRE_DAYS)
 
 def decode_jwt(token: str) -> dict:
+    from jose import jwt
+
+    settings = get_settings()
     return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 
 def bearer_token_from_header(
@@ -97,8 +153,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    result = await session.execute(select(User).where(User.id == user_id).limit(1))
-    user = result.scalar_one_or_none()
+    user = await get_by_id(session, User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
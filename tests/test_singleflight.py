@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from src.config import get_settings
+from src.db import session as db_session
+from src.db.base import Base
+from src.db.models import Project, User
+from src.db.singleflight import get_by_id
+from src.metrics import metrics
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    for var, value in {"ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "5",
+                       "REFRESH_TOKEN_EXPIRE_DAYS": "1", "SECRET_KEY": "test"}.items():
+        monkeypatch.setenv(var, value)
+    get_settings.cache_clear()
+    db_session.get_engine.cache_clear()
+    db_session.get_sessionmaker.cache_clear()
+    yield
+    get_settings.cache_clear()
+    db_session.get_engine.cache_clear()
+    db_session.get_sessionmaker.cache_clear()
+
+
+async def _seed() -> None:
+    async with db_session.get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with db_session.get_sessionmaker()() as session:
+        session.add(User(id=1, email="owner@example.com", password="x"))
+        session.add(Project(id=1, name="project", owner_id=1))
+        await session.commit()
+
+
+async def _request() -> tuple:
+    # как require_owner_of_project: обе зависимости на одной закешированной сессии
+    async with db_session.get_sessionmaker()() as session:
+        user = await get_by_id(session, User, 1)
+        project = await get_by_id(session, Project, 1)
+        return user.id, project.owner_id
+
+
+def test_concurrent_requests_coalesce_user_and_project_lookups(sqlite_db):
+    async def run():
+        await _seed()
+        before = metrics.snapshot()
+        results = await asyncio.gather(*(_request() for _ in range(10)))
+        after = metrics.snapshot()
+        await db_session.get_engine().dispose()
+        return results, {k: after.get(k, 0) - before.get(k, 0) for k in after}
+
+    results, delta = asyncio.run(run())
+
+    assert results == [(1, 1)] * 10
+    # по одному запросу на User и на Project, остальные 9 + 9 присоединились
+    assert delta["singleflight.db_reads.executed"] == 2
+    assert delta["singleflight.db_reads.coalesced"] == 18
+
+
+def test_session_holding_connection_reads_on_its_own(sqlite_db):
+    async def run():
+        await _seed()
+        async with db_session.get_sessionmaker()() as session:
+            await session.get(User, 1)  # берёт соединение и открывает транзакцию
+            before = metrics.get("singleflight.db_reads.executed")
+            project = await get_by_id(session, Project, 1)
+            after = metrics.get("singleflight.db_reads.executed")
+        await db_session.get_engine().dispose()
+        return project, after - before
+
+    project, executed = asyncio.run(run())
+    assert project.id == 1
+    assert executed == 0